@@ -64,12 +64,12 @@ def receive_one_line(socket):
         A string representing a single line with a terminating newline or
         None if the connection has been closed.
     """
-    data = b''
+    data = bytearray()
     while True:
         packet = socket.recv(PACKET_SIZE)
         if not packet:  # Connection has been closed.
             return None
-        data += packet
+        data += packet  # amortized O(1), unlike concatenating bytes
         if b'\0' in packet:
             break
     # TODO Is there a better way of handling bad input than 'replace'?
@@ -2,32 +2,100 @@ import sys
 import numpy as np
 import pyaudio
 import socket
-import line_packet
-from pynput.keyboard import Controller as KeyController
+from pynput.keyboard import Controller as KeyController, Key
 from PyQt5 import QtWidgets, QtCore
 from PyQt5.QtCore import Qt, pyqtSignal, QThread
 import pyqtgraph as pg
 import asyncio
 from PyQt5 import QtGui
 import os
+import queue
+import re
+import json
+
+try:
+    import ahocorasick
+except ImportError:  # optional: fall back to a compiled regex alternation
+    ahocorasick = None
+
+try:
+    from numba import njit
+except ImportError:  # optional: fall back to the NumPy reduction
+    njit = None
 
 
 # No local ASR: use remote whisper_online_server
 # Constants for audio
+# frames per PortAudio buffer. One buffer is one waveform update and one
+# send, so the default keeps both at 64 ms; larger buffers (--chunk) trade
+# that latency for fewer wakeups
 CHUNK = 1024
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 # server expects 16kHz
 RATE = 16000 
+# samples per waveform frame, independent of CHUNK
+WAVE_FRAME = 1024
+# number of waveform bars
+BARS = 60
+# preallocated bar arrays handed to the GUI in turn; a slot is reused after
+# WAVE_SLOTS updates (~256 ms at the default CHUNK, longer with bigger buffers)
+WAVE_SLOTS = 4
+# audio is sent to the server in batches of this many bytes, or after SEND_FLUSH_MS
+SEND_BATCH_BYTES = 8192
+SEND_FLUSH_MS = 20
+# audio is dropped rather than buffered past this many unsent bytes (~8 s),
+# e.g. while the server isn't reading
+SEND_HIGH_WATER = 262144
+# seconds the final flush and close may take before the connection is aborted
+CLOSE_TIMEOUT = 0.5
+# text longer than this is pasted through the clipboard instead of typed
+PASTE_MIN_CHARS = 32
+# socket buffer sizes for the transcription connection
+SOCK_BUF_BYTES = 65536
+
+
+def downsample_abs_mean(w, edges, widths, out, scratch):
+    # mean magnitude of w per bin [edges[b], edges[b+1]); bins may differ in width.
+    # scratch is an int32 buffer of w's size, so nothing is allocated per call
+    np.abs(w, out=scratch, dtype=np.int32)
+    np.add.reduceat(scratch, edges[:-1], dtype=out.dtype, out=out)
+    out /= widths
+    return out
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def downsample_abs_mean(w, edges, widths, out, scratch):
+        # one fused pass: abs and per-bin sums without temporaries
+        for b in range(out.size):
+            s = 0
+            for i in range(edges[b], edges[b + 1]):
+                v = np.int64(w[i])
+                s += v if v >= 0 else -v
+            out[b] = s / widths[b]
+        return out
 
 class AudioRecorder(QThread):
     audio_chunk = pyqtSignal(bytes)
     data_ready = pyqtSignal(np.ndarray)
 
-    def __init__(self):
+    def __init__(self, chunk=CHUNK):
         super().__init__()
         self._running = False
+        self._chunk = chunk
         self._pa = pyaudio.PyAudio()
+        self._wave = np.zeros(WAVE_FRAME, dtype=np.int16)
+        # bar heights are computed here, off the GUI thread
+        self._heights_ring = np.empty((WAVE_SLOTS, BARS), dtype=np.float32)
+        self._bin_edges = np.linspace(0, WAVE_FRAME, BARS + 1).astype(np.intp)
+        self._bin_widths = np.diff(self._bin_edges)
+        self._abs_buf = np.empty(WAVE_FRAME, dtype=np.int32)
+        self._queue = queue.SimpleQueue()
+
+    def _cb(self, in_data, frame_count, time_info, status):
+        # runs on the PortAudio thread: hand the bytes over and return at once
+        self._queue.put(in_data)
+        return (None, pyaudio.paContinue)
 
     def run(self):
         try:
@@ -36,26 +104,45 @@ class AudioRecorder(QThread):
                 channels=CHANNELS,
                 rate=RATE,
                 input=True,
-                frames_per_buffer=CHUNK
+                frames_per_buffer=self._chunk,
+                stream_callback=self._cb
             )
         except Exception as e:
             print(f"Audio input error: {e}")
             return
         self._running = True
+        fresh = 0
+        slot = 0
         while self._running:
-            try:
-                data = stream.read(CHUNK, exception_on_overflow=False)
-            except Exception:
-                continue
+            # block until PortAudio delivers a buffer; stop() wakes us with None
+            data = self._queue.get()
+            if data is None:
+                break
             self.audio_chunk.emit(data)
-            wave = np.frombuffer(data, dtype=np.int16)
-            self.data_ready.emit(wave)
+            # slide the newest samples into the waveform frame
+            samples = np.frombuffer(data, dtype=np.int16)[-WAVE_FRAME:]
+            n = samples.size
+            self._wave[:WAVE_FRAME - n] = self._wave[n:]
+            self._wave[WAVE_FRAME - n:] = samples
+            fresh += n
+            if fresh >= WAVE_FRAME:
+                # mean magnitude per bar, written straight into a ring slot
+                heights = downsample_abs_mean(self._wave, self._bin_edges,
+                                              self._bin_widths, self._heights_ring[slot],
+                                              self._abs_buf)
+                self.data_ready.emit(heights)
+                slot = (slot + 1) % WAVE_SLOTS
+                fresh = 0
         stream.stop_stream()
         stream.close()
 
     def stop(self):
         self._running = False
+        self._queue.put(None)
         self.wait()
+        # drop anything left over (e.g. the sentinel if run() never started)
+        while not self._queue.empty():
+            self._queue.get_nowait()
 
 class RemoteTranscriber(QThread):
     text_ready = pyqtSignal(str)
@@ -64,36 +151,124 @@ class RemoteTranscriber(QThread):
         super().__init__()
         self.host = host
         self.port = port
-        self._running = True
-        self.sock = None
+        # one asyncio loop on this thread does all socket I/O (send and receive)
+        self._loop = asyncio.new_event_loop()
+        self._task = None
+        self._writer = None
+        # cleared once the session is over (connect failed, server closed or
+        # stop()); read by send_chunk on the recorder thread
+        self._linked = True
+        # touched only on the loop thread
+        self._pending = []
+        self._pending_bytes = 0
+        self._flush_handle = None
+        self._dropping = False
 
     def run(self):
+        asyncio.set_event_loop(self._loop)
+        self._task = self._loop.create_task(self._session())
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+
+    async def _session(self):
         # connect to whisper_online_server
         try:
-            self.sock = socket.create_connection((self.host, self.port))
-            self.sock.setblocking(False)
+            reader, writer = await asyncio.open_connection(self.host, self.port)
         except Exception as e:
             print(f"Could not connect to server: {e}")
+            self._linked = False
+            self._pending = []
+            self._pending_bytes = 0
             return
-        while self._running:
-            QtCore.QThread.msleep(10)
+        except asyncio.CancelledError:
+            self._linked = False  # stop() was called while connecting
+            return
+        sock = writer.get_extra_info('socket')
+        # we batch sends ourselves, so Nagle would only add delay
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_BYTES)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_BYTES)
+        self._writer = writer
+        # audio recorded while connecting goes out first
+        self._flush(writer)
+        try:
+            while True:
+                line = await reader.readuntil(b'\n')
+                if hasattr(socket, 'TCP_QUICKACK'):  # Linux only; not sticky
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+                # "<beg> <end> <text>": decode only the text, skip the timestamps
+                b = line.rstrip()
+                i = b.find(b' ')
+                j = b.find(b' ', i + 1) if i >= 0 else -1
+                if j > 0:
+                    self.text_ready.emit(b[j + 1:].decode('utf-8', 'replace'))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass  # server closed the connection
+        except asyncio.CancelledError:
+            pass  # stop() was called
+        finally:
+            self._linked = False
+            self._writer = None
+            self._flush(writer)
             try:
-                lines = line_packet.receive_lines(self.sock)
-                for line in lines:
-                    parts = line.strip().split(' ', 2)
-                    if len(parts) == 3:
-                        _, _, text = parts
-                        self.text_ready.emit(text)
-            except BlockingIOError:
-                continue
-
-    @QtCore.pyqtSlot(bytes)
+                await asyncio.wait_for(self._close(writer), CLOSE_TIMEOUT)
+            except Exception:
+                # the server isn't taking the rest of the audio; don't wait on it
+                writer.transport.abort()
+
+    async def _close(self, writer):
+        # signal EOF by shutting down write, once the queued audio is out
+        if writer.can_write_eof():
+            writer.write_eof()
+        writer.close()
+        await writer.wait_closed()
+
     def send_chunk(self, chunk: bytes):
-        # non-blocking send; ignore errors
+        # called directly on the recorder thread (Qt.DirectConnection)
+        if not self._linked:
+            return  # no session to send it to
         try:
-            self.sock.send(chunk)
-        except (BlockingIOError, BrokenPipeError, OSError):
-            pass
+            self._loop.call_soon_threadsafe(self._queue_chunk, chunk)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _queue_chunk(self, chunk):
+        # a full batch is written right away, a partial one after SEND_FLUSH_MS
+        if not self._linked:
+            return
+        if self._writer is None:
+            # still connecting: keep it for the first flush, within bounds
+            if self._pending_bytes < SEND_HIGH_WATER:
+                self._pending.append(chunk)
+                self._pending_bytes += len(chunk)
+            return
+        self._pending.append(chunk)
+        self._pending_bytes += len(chunk)
+        if self._pending_bytes >= SEND_BATCH_BYTES:
+            self._flush(self._writer)
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                SEND_FLUSH_MS / 1000, self._flush, self._writer)
+
+    def _flush(self, writer):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        if writer.transport.get_write_buffer_size() > SEND_HIGH_WATER:
+            # the server has stopped reading; don't buffer without limit
+            if not self._dropping:
+                print("Server is not keeping up, dropping audio")
+                self._dropping = True
+        else:
+            # the transport hands the whole batch to the kernel in one call
+            writer.writelines(self._pending)
+            self._dropping = False
+        self._pending = []
+        self._pending_bytes = 0
     
     @QtCore.pyqtSlot(str)
     def _display_and_type(self, text):
@@ -102,15 +277,16 @@ class RemoteTranscriber(QThread):
 
 
     def stop(self):
-        self._running = False
-        if self.sock:
-            try:
-                # signal EOF by shutting down write
-                self.sock.shutdown(socket.SHUT_WR)
-                self.sock.close()
-            except Exception:
-                pass
+        try:
+            self._loop.call_soon_threadsafe(self._cancel)
+        except RuntimeError:
+            pass
         self.wait()
+        self._loop.close()
+
+    def _cancel(self):
+        if self._task is not None:
+            self._task.cancel()
 
 class HotkeyListener(QThread):
     def __init__(self, window):
@@ -160,8 +336,32 @@ class HotkeyListener(QThread):
             self.listener.stop()
         self.quit()
 
+class WaveformBars(pg.GraphicsObject):
+    # Plain filled rectangles for the level meter; heights are updated in place
+    def __init__(self, n=BARS, width=0.8, max_height=40):
+        super().__init__()
+        self._rects = [QtCore.QRectF(i - width / 2, 0, width, 0) for i in range(n)]
+        self._bounds = QtCore.QRectF(-0.5, 0, n, max_height)
+        self._brush = pg.mkBrush(128, 128, 128)
+
+    def setHeights(self, heights):
+        for rect, h in zip(self._rects, heights):
+            rect.setHeight(float(h))
+        self.update()
+
+    def reset(self):
+        self.setHeights([0.0] * len(self._rects))
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, p, *args):
+        p.setPen(Qt.NoPen)
+        p.setBrush(self._brush)
+        p.drawRects(self._rects)
+
 class SuperWhisperWindow(QtWidgets.QWidget):
-    def __init__(self, host, port):
+    def __init__(self, host, port, chunk=CHUNK):
         super().__init__()
         self.kb = KeyController()
         self.transcriber = None
@@ -169,6 +369,17 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         self.port = port
         self.deepseek_r1_enabled = True
         self.replacements = self._load_text_replacements()
+        self._replacements_json = json.dumps(self.replacements, indent=2)
+        self._compile_replacements(self.replacements)
+
+        # The user's clipboard while a paste is in flight; one restartable timer
+        # restores it 200 ms after the last paste, so back-to-back pastes don't
+        # save our own text as the user's
+        self._saved_clipboard = None
+        self._clipboard_timer = QtCore.QTimer(self)
+        self._clipboard_timer.setSingleShot(True)
+        self._clipboard_timer.setInterval(200)
+        self._clipboard_timer.timeout.connect(self._restore_clipboard)
 
 
         self.setWindowFlags(
@@ -192,13 +403,16 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         bg_layout.setContentsMargins(10, 5, 10, 5)
         main.addWidget(bg)
 
-        pg.setConfigOptions(antialias=True)
+        pg.setConfigOptions(antialias=False, useOpenGL=False)
         self.plot = pg.PlotWidget(bg)
         self.plot.setBackground(None)
         self.plot.hideAxis('bottom')
         self.plot.hideAxis('left')
-        self.bars = pg.BarGraphItem(x=[], height=[], width=0.8)
+        self.bars = WaveformBars(BARS)
         self.plot.addItem(self.bars)
+        self._smoothed_heights = np.zeros(BARS)
+        self._last_drawn_heights = np.zeros(BARS)
+        self._pending_paint = False
         bg_layout.addWidget(self.plot)
 
         status = QtWidgets.QHBoxLayout()
@@ -212,7 +426,7 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         status.addWidget(QtWidgets.QLabel('Esc to Close'), alignment=Qt.AlignRight)
         bg_layout.addLayout(status)
 
-        self.recorder = AudioRecorder()
+        self.recorder = AudioRecorder(chunk)
         self.recorder.data_ready.connect(self.update_waveform)
 
         self.hk = HotkeyListener(self)
@@ -226,6 +440,43 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    def _compile_replacements(self, rules):
+        # Build a single-pass matcher once instead of one str.replace per rule
+        rules = [r for r in rules if r["from"]]
+        self._replacer = None
+        self._pat = None
+        # 1->1 (or 1->0) character rules run through str.translate in C
+        single = {r["from"]: r["to"] for r in rules
+                  if len(r["from"]) == 1 and len(r["to"]) <= 1}
+        self._trans = str.maketrans(single) if single else None
+        rules = [r for r in rules if r["from"] not in single]
+        if not rules:
+            return
+        if ahocorasick is not None:
+            self._replacer = ahocorasick.Automaton()
+            for r in rules:
+                self._replacer.add_word(r["from"], (r["from"], r["to"]))
+            self._replacer.make_automaton()
+        else:
+            froms = sorted((r["from"] for r in rules), key=len, reverse=True)
+            self._pat = re.compile("|".join(map(re.escape, froms)))
+            self._map = {r["from"]: r["to"] for r in rules}
+
+    def _apply_replacements(self, text):
+        if self._trans is not None:
+            text = text.translate(self._trans)
+        if self._replacer is not None:
+            out, pos = [], 0
+            for end, (src, dst) in self._replacer.iter_long(text):
+                out.append(text[pos:end - len(src) + 1])
+                out.append(dst)
+                pos = end + 1
+            out.append(text[pos:])
+            return "".join(out)
+        if self._pat is not None:
+            return self._pat.sub(lambda m: self._map[m.group(0)], text)
+        return text
+
     @QtCore.pyqtSlot()
     def _stop_recording(self):
         if self.recorder.isRunning():
@@ -237,7 +488,9 @@ class SuperWhisperWindow(QtWidgets.QWidget):
                 self.transcriber.stop()
                 self.transcriber = None
             self.btn.setChecked(False)
-            self.bars.setOpts(x=[], height=[], width=0.8)
+            self.bars.reset()
+            self._smoothed_heights[:] = 0
+            self._last_drawn_heights[:] = 0
             CLOSE = False
             if CLOSE:
                 QtCore.QTimer.singleShot(500, self._close_window)
@@ -263,7 +516,7 @@ class SuperWhisperWindow(QtWidgets.QWidget):
             self.label.setStyleSheet("color:red; font:9pt 'Sans';")
             self.btn.setChecked(True)
             self.transcriber = RemoteTranscriber(self.host, self.port)
-            self.recorder.audio_chunk.connect(self.transcriber.send_chunk, QtCore.Qt.QueuedConnection)
+            self.recorder.audio_chunk.connect(self.transcriber.send_chunk, QtCore.Qt.DirectConnection)
             self.transcriber.text_ready.connect(self._display_and_type)
             self.transcriber.start()
             self.recorder.start()
@@ -271,17 +524,44 @@ class SuperWhisperWindow(QtWidgets.QWidget):
     @QtCore.pyqtSlot(str)
     def _display_and_type(self, text):
         if self.deepseek_r1_enabled:
-            for rule in self.replacements:
-                text = text.replace(rule["from"], rule["to"])
+            text = self._apply_replacements(text)
         print(f"[Typed] {text}")
-        self.kb.type(text)
+        self._type_text(text)
+
+    def _type_text(self, text):
+        # pynput sends one key event per character; paste long text in one go
+        if len(text) <= PASTE_MIN_CHARS:
+            self.kb.type(text)
+            return
+        clipboard = QtWidgets.QApplication.clipboard()
+        if not self._clipboard_timer.isActive():
+            self._saved_clipboard = self._copy_mime_data(clipboard.mimeData())
+        clipboard.setText(text)
+        with self.kb.pressed(Key.ctrl):
+            self.kb.press('v')
+            self.kb.release('v')
+        # give the target app time to read the clipboard before restoring it
+        self._clipboard_timer.start()
+
+    def _restore_clipboard(self):
+        self._clipboard_timer.stop()
+        QtWidgets.QApplication.clipboard().setMimeData(self._saved_clipboard)
+        self._saved_clipboard = None
+
+    @staticmethod
+    def _copy_mime_data(source):
+        # every format, not just text(), so images, files and rich text survive
+        # the paste; the clipboard's own QMimeData changes with its contents
+        saved = QtCore.QMimeData()
+        if source is not None:
+            for fmt in source.formats():
+                saved.setData(fmt, source.data(fmt))
+        return saved
 
     
     def _correct_text(self, text):
         from ollama import Client
         import re
-        import json
-        import os
         import time
 
         corrected_result = {"text": text}
@@ -304,11 +584,7 @@ class SuperWhisperWindow(QtWidgets.QWidget):
             retries = 3
             for attempt in range(1, retries + 1):
                 try:
-                    path = os.path.join(os.path.dirname(__file__), "text_replacements.json")
-                    with open(path, "r", encoding="utf-8") as file:
-                        replacements = json.load(file)
-
-                    replacement_str = json.dumps(replacements, indent=2)
+                    replacement_str = self._replacements_json
 
                     message = {
                         'role': 'user',
@@ -344,7 +620,7 @@ class SuperWhisperWindow(QtWidgets.QWidget):
 
         # Show result and type
         print(f"[Typed] {corrected_result['text']}")
-        self.kb.type(corrected_result['text'])
+        self._type_text(corrected_result['text'])
 
         # Reset UI
         self.plot.show()
@@ -380,6 +656,9 @@ class SuperWhisperWindow(QtWidgets.QWidget):
                 self.recorder.stop()
 
             self.hk.stop()
+
+            if self._clipboard_timer.isActive():
+                self._restore_clipboard()
         except Exception as e:
             print(f"[ERROR] Exception during shutdown: {e}")
         
@@ -387,23 +666,36 @@ class SuperWhisperWindow(QtWidgets.QWidget):
 
 
  
+    def _paint_done(self):
+        self._pending_paint = False
+
     @QtCore.pyqtSlot(np.ndarray)
-    def update_waveform(self, w):
-        # Smooth values over time using exponential moving average
-        parts = np.array_split(np.abs(w), 60)
-        heights = np.array([np.mean(p) for p in parts])
-        m = np.max(heights) or 1
-        new_heights = heights / m * 40  # Normalize to a max height of 40
-
-        # If previous values exist, smooth the transition
-        if not hasattr(self, '_smoothed_heights'):
-            self._smoothed_heights = new_heights
-        else:
-            # Exponential moving average for smooth animation
-            self._smoothed_heights = 0.6 * self._smoothed_heights + 0.4 * new_heights
+    def update_waveform(self, heights):
+        # heights: mean magnitude per bar, computed on the recorder thread
+        # Drop frames while the previous paint is still in flight
+        if self._pending_paint:
+            return
+
+        m = heights.max()
+
+        # Exponential moving average for smooth animation (in place)
+        self._smoothed_heights *= 0.6
+        if m:
+            new_heights = heights * (40.0 / m)  # Normalize to a max height of 40
+            self._smoothed_heights += 0.4 * new_heights
+        elif self._smoothed_heights.max() < 0.5:
+            # Silence: once the bars have decayed, settle on flat zeros
+            self._smoothed_heights[:] = 0
+
+        # Skip the redraw when no bar moved by half a pixel or more
+        delta = np.max(np.abs(self._smoothed_heights - self._last_drawn_heights))
+        if delta < 0.5:
+            return
+        self._last_drawn_heights[:] = self._smoothed_heights
 
-        x = np.arange(len(self._smoothed_heights))
-        self.bars.setOpts(x=x, height=self._smoothed_heights, width=0.8)
+        self._pending_paint = True
+        self.bars.setHeights(self._smoothed_heights)
+        QtCore.QTimer.singleShot(33, self._paint_done)
 
 
     def closeEvent(self, event):
@@ -415,8 +707,11 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--host', type=str, default='localhost')
     parser.add_argument('--port', type=int, default=43007)
+    parser.add_argument('--chunk', type=int, default=CHUNK,
+                        help='frames per audio buffer; values above 1024 slow '
+                             'the waveform and batch audio sent to the server')
     args = parser.parse_args()
 
     app = QtWidgets.QApplication(sys.argv)
-    win = SuperWhisperWindow(args.host, args.port)
+    win = SuperWhisperWindow(args.host, args.port, args.chunk)
     sys.exit(app.exec_())
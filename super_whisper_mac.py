@@ -5,15 +5,15 @@ Super‑Whisper overlay
  • Never steals focus (WindowDoesNotAcceptFocus + WA_ShowWithoutActivating)
  • Stays visible across spaces / full‑screen on macOS
 """
-import sys, os, socket, json, audioop, numpy as np
+import sys, os, re, queue, socket, selectors, threading, json, numpy as np
+from   collections import deque
 from   ctypes import c_void_p
-import pyaudio, line_packet
-from   pynput.keyboard   import Controller as KeyController
+from   math   import gcd
+import sounddevice as sd, line_packet
+from   pynput.keyboard   import Controller as KeyController, Key, Listener as KeyListener
 from   PyQt5             import QtWidgets, QtCore
 from   PyQt5.QtCore      import Qt, pyqtSignal, QThread
 import pyqtgraph as pg
-import subprocess
-import shutil
 
 if sys.platform == "darwin":
     import objc
@@ -24,140 +24,251 @@ if sys.platform == "darwin":
         NSWindowCollectionBehaviorIgnoresCycle,
         NSFloatingWindowLevel,
     )
+    BEHAVIOR_MASK = (NSWindowCollectionBehaviorCanJoinAllSpaces
+                     | NSWindowCollectionBehaviorStationary
+                     | NSWindowCollectionBehaviorFullScreenAuxiliary
+                     | NSWindowCollectionBehaviorIgnoresCycle)
 
 TARGET_RATE = 16_000          # Whisper server expects 16 kHz
-FORMAT      = pyaudio.paInt16
 CHANNELS    = 1
 CHUNK       = 1024            # frames @ TARGET_RATE
+MAX_LINES   = 64              # transcript lines emitted per selector wakeup
+PASTE_MIN   = 20              # longer text is pasted via the clipboard, not typed
+PASTE_KEY   = Key.cmd if sys.platform == "darwin" else Key.ctrl
+
+class PolyphaseResampler:
+    """Stateful int16 resampler: upsample by L, Kaiser-windowed sinc low-pass,
+    downsample by M, evaluated in polyphase form. The input tail is carried
+    between chunks so the filter state survives chunk boundaries."""
+    def __init__(self, rate_in, rate_out, half_len=16, beta=5.0):
+        g = gcd(rate_in, rate_out)
+        self.up, self.down = L, M = rate_out // g, rate_in // g
+        q = max(L, M); n = 2 * half_len * q + 1
+        h = np.sinc((np.arange(n) - (n - 1) / 2) / q) * np.kaiser(n, beta)
+        h *= L / h.sum()                          # unity DC gain after upsampling
+        self._kp = -(-n // L)                     # taps per phase
+        taps = np.zeros(self._kp * L); taps[:n] = h
+        self._phases = taps.reshape(self._kp, L).T.astype(np.float32)  # [p, m] = h[p + m*L]
+        self._lags = np.arange(self._kp)
+        self.reset()
+
+    def reset(self):
+        """Forget the carried input so a new recording starts from silence."""
+        self._hist = np.zeros(self._kp - 1, np.float32)   # last inputs of the previous chunk
+        self._t = (self._kp - 1) * self.up        # next output time, upsampled units
+
+    def process(self, x):
+        xx = np.concatenate((self._hist, x.astype(np.float32)))
+        L, M, n_in = self.up, self.down, xx.size
+        last = n_in * L - 1                       # newest upsampled time we can produce
+        count = (last - self._t) // M + 1 if self._t <= last else 0
+        j, p = np.divmod(self._t + M * np.arange(count), L)
+        y = np.einsum('nm,nm->n', self._phases[p], xx[j[:, None] - self._lags])
+        keep = self._kp - 1
+        self._hist = xx[n_in - keep:].copy()
+        self._t += count * M - (n_in - keep) * L
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
 
 class AudioRecorder(QThread):
-    audio_chunk = pyqtSignal(bytes)
-    data_ready  = pyqtSignal(np.ndarray)
+    audio_chunk = pyqtSignal(object)       # bytes or int16 ndarray (buffer protocol)
+    bins_ready  = pyqtSignal(np.ndarray)   # 60 mean magnitudes (float32) per chunk
 
     def __init__(self):
         super().__init__()
-        self._pa       = pyaudio.PyAudio()
-        self._running  = False
+        self._q        = queue.SimpleQueue() # PortAudio callback → run(); None = stop
         self._rate     = TARGET_RATE     # actual device rate
-        self._need_rs  = False           # resample required?
+        self._rs       = None            # PolyphaseResampler when rates differ
+        self._layouts  = {}              # chunk size → (bin start edges, bin widths)
+        self._abs_buf  = np.empty(0, np.int32)  # scratch for |x|, grown on demand
+        # open the device once, stopped, so a recording only has to start it
+        self._stream   = None
+        try: self._stream = self._open_stream()
+        except Exception as e: print("[audio] cannot open mic:", e)
+
+    # runs on PortAudio's thread: copy the block out and get back to C
+    def _cb(self, indata, frames, time_info, status):
+        self._q.put(bytes(indata))
 
-    # try 16 kHz; if device refuses, open at native rate & flag resample
+    # try 16 kHz; if device refuses, open at native rate & flag resample
     def _open_stream(self):
+        self._rate, self._rs = TARGET_RATE, None
         try:
-            return self._pa.open(format=FORMAT, channels=CHANNELS,
-                                 rate=TARGET_RATE, input=True,
-                                 frames_per_buffer=CHUNK)
+            return sd.RawInputStream(samplerate=TARGET_RATE, channels=CHANNELS,
+                                     dtype='int16', blocksize=CHUNK,
+                                     callback=self._cb)
         except Exception:
-            info = self._pa.get_default_input_device_info()
-            self._rate = int(info['defaultSampleRate'])
-            self._need_rs = (self._rate != TARGET_RATE)
+            info = sd.query_devices(kind='input')
+            self._rate = int(info['default_samplerate'])
+            if self._rate != TARGET_RATE:
+                self._rs = PolyphaseResampler(self._rate, TARGET_RATE)
             chunk_dev = int(CHUNK * self._rate / TARGET_RATE)
-            return self._pa.open(format=FORMAT, channels=CHANNELS,
-                                 rate=self._rate, input=True,
-                                 frames_per_buffer=chunk_dev)
+            return sd.RawInputStream(samplerate=self._rate, channels=CHANNELS,
+                                     dtype='int16', blocksize=chunk_dev,
+                                     callback=self._cb)
 
     def run(self):
-        try:
-            stream = self._open_stream()
-        except Exception as e:
-            print("[audio] cannot open mic:", e)
-            return
+        if self._stream is None:                 # mic was missing at start-up
+            try: self._stream = self._open_stream()
+            except Exception as e:
+                print("[audio] cannot open mic:", e)
+                return
+        if self._rs is not None: self._rs.reset()
+        self._stream.start()
 
-        self._running = True
-        while self._running:
-            try:
-                raw = stream.read(stream._frames_per_buffer,
-                                  exception_on_overflow=False)
-            except Exception:
-                continue
+        while True:
+            raw = self._q.get()                  # blocks until the callback delivers
+            if raw is None: break                # stop()
 
-            if self._need_rs:
-                raw, _ = audioop.ratecv(raw, 2, 1,
-                                        self._rate, TARGET_RATE, None)
+            x = np.frombuffer(raw, dtype=np.int16)
+            if self._rs is not None:
+                raw = x = self._rs.process(x)   # socket.send takes the array as-is
 
             self.audio_chunk.emit(raw)
-            self.data_ready.emit(np.frombuffer(raw, dtype=np.int16))
+            self.bins_ready.emit(self._bins(x))
 
-        stream.stop_stream()
-        stream.close()
+        self._stream.stop()                      # kept open for the next recording
+
+    # waveform bins are reduced here so only 240 bytes cross to the GUI thread
+    def _bins(self, x):
+        n = x.size
+        lay = self._layouts.get(n)               # resampled chunks may vary in length
+        if lay is None:
+            edges = np.linspace(0, n, 61).astype(np.intp)
+            lay = self._layouts[n] = (edges[:-1], np.diff(edges).astype(np.float32))
+            if n > self._abs_buf.size: self._abs_buf = np.empty(n, np.int32)
+        edges, widths = lay
+        # int32 loop: abs(-32768) wraps in int16
+        a = np.absolute(x, out=self._abs_buf[:n], dtype=np.int32)
+        h = np.add.reduceat(a, edges, dtype=np.float32)   # all 60 sums in one C pass
+        h /= widths
+        return h
 
     def stop(self):
-        self._running = False
-        self.quit(); self.wait(100)
+        self._q.put(None)
+        self.quit(); self.wait()
+        # blocks that landed after the sentinel belong to no session
+        while True:
+            try: self._q.get_nowait()
+            except queue.Empty: break
+
+    def close(self):
+        self.stop()
+        if self._stream is not None: self._stream.close(); self._stream = None
 
 class RemoteTranscriber(QThread):
+    """One thread for the window's lifetime, one connection per recording: the
+    server resets its ASR state only per connection, so reusing a link would
+    carry one recording's uncommitted words (and audio timeline) into the next"""
     text_ready = pyqtSignal(str)
     def __init__(self, host, port):
         super().__init__()
         self.host, self.port = host, port
         self._running = True
+        self._enabled = threading.Event()          # set while a session is recording
+        self._linked  = threading.Event()          # cleared if the connect fails / link drops
+        self._session = threading.Event()          # enable() asks for a new connection
+        self._gen = 0                              # bumped per recording
         self.sock = None
+        self._out = deque()                        # this recording's chunks waiting for the socket
+        self._lines = deque()                      # received lines not yet emitted
+        # send_chunk()/disable()/stop() poke this pair so the selector wakes up at once
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False); self._wake_w.setblocking(False)
     def run(self):
+        while self._running:
+            if not self._session.wait(0.25): continue
+            self._session.clear()
+            gen, out = self._gen, self._out
+            self._run_session(gen, out)
+            # nothing carries over into the next recording (which has its own queue)
+            out.clear(); self._lines.clear()
+            if gen == self._gen: self._linked.clear()
+    def _run_session(self, gen, out):
         try:
             self.sock = socket.create_connection((self.host, self.port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
             self.sock.setblocking(False)
         except Exception as e:
             print("[net] connect error:", e); return
-        while self._running:
-            QtCore.QThread.msleep(10)
-            try:
-                for line in line_packet.receive_lines(self.sock):
-                    parts = line.strip().split(' ', 2)
-                    if len(parts) == 3:
-                        self.text_ready.emit(parts[2])
-            except BlockingIOError:
-                continue
-    @QtCore.pyqtSlot(bytes)
+        # sleep in the kernel until the server sends something, the socket can
+        # take more audio, or send_chunk()/disable()/stop() wake us through _wake_r
+        sel = selectors.DefaultSelector()
+        sel.register(self.sock, selectors.EVENT_READ)
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        events = selectors.EVENT_READ
+        try:
+            while self._running and self._enabled.is_set() and gen == self._gen:
+                want = selectors.EVENT_READ | (selectors.EVENT_WRITE if out else 0)
+                if want != events: sel.modify(self.sock, want); events = want
+                # leftover lines from a burst: just poll, then emit the next batch
+                for key, ev in sel.select(timeout=0 if self._lines else 0.25):
+                    if key.fileobj is self._wake_r:
+                        try: self._wake_r.recv(4096)
+                        except BlockingIOError: pass
+                        continue
+                    if ev & selectors.EVENT_WRITE: self._flush(out)
+                    if ev & selectors.EVENT_READ:
+                        lines = line_packet.receive_lines(self.sock)
+                        if lines is None:              # server closed the connection
+                            print("[net] server closed the connection"); return
+                        self._lines.extend(lines)
+                # at most MAX_LINES per wakeup so a burst can't hold off disable()
+                self._emit_lines(MAX_LINES)
+            # end of the recording: emit what arrived, hand over whatever audio
+            # is still queued, then close so the server starts afresh next time
+            self._emit_lines(len(self._lines))
+            self.sock.settimeout(0.5)
+            while out: self.sock.sendall(out.popleft())
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass                                   # peer went away / flush timed out
+        finally:
+            sel.close(); self.sock.close(); self.sock = None
+    def _emit_lines(self, n):
+        for _ in range(min(n, len(self._lines))):
+            parts = self._lines.popleft().strip().split(' ', 2)
+            if len(parts) == 3:
+                self.text_ready.emit(parts[2])
+    def _flush(self, out):
+        # write as much as the kernel takes; a partial send leaves the rest of
+        # the chunk at the head of the queue for the next EVENT_WRITE
+        while out:
+            buf = memoryview(out[0]).cast('B')
+            try: n = self.sock.send(buf)
+            except BlockingIOError: return
+            if n < len(buf):
+                out[0] = buf[n:]; return
+            out.popleft()
+    @QtCore.pyqtSlot(object)
     def send_chunk(self, b):
-        try: self.sock.send(b)
-        except (BlockingIOError, BrokenPipeError, OSError): pass
-    def stop(self):
-        self._running = False
-        if self.sock:
-            try: self.sock.shutdown(socket.SHUT_WR); self.sock.close()
-            except Exception: pass
-        self.quit(); self.wait(100)
-
-class HotkeyListener(QThread):
-    """Ctrl+Space → start/stop, Esc → quit"""
-    def __init__(self, window):
-        super().__init__(); self.window = window; self.ctrl = False
-    def run(self):
-        from pynput import keyboard
-        self.listener = keyboard.Listener(
-            on_press=self.on_press, on_release=self.on_release, daemon=True)
-        self.listener.start(); self.exec_()
-    def on_press(self, key):
-        from pynput.keyboard import Key
-        if key in (Key.ctrl_l, Key.ctrl_r): self.ctrl = True
-        elif key == Key.space and self.ctrl:
-            QtCore.QMetaObject.invokeMethod(self.window, '_toggle_recording',
-                                            Qt.QueuedConnection)
-        elif key == Key.esc:
-            QtCore.QMetaObject.invokeMethod(self.window, '_exit_app',
-                                            Qt.QueuedConnection)
-    def on_release(self, key):
-        from pynput.keyboard import Key
-        if key in (Key.ctrl_l, Key.ctrl_r): self.ctrl = False
-    def stop(self):
-        if hasattr(self, 'listener'): self.listener.stop()
-        self.quit()
+        # nothing to send it over: don't pile audio up until the next toggle
+        if not (self._enabled.is_set() and self._linked.is_set()): return
+        self._out.append(b)
+        self._wake()
+    def _wake(self):
+        try: self._wake_w.send(b'\0')
+        except OSError: pass                       # a wake-up is already pending
+    def enable(self):
+        # audio is queued while the session connects, and dropped if it can't
+        self._out = deque(); self._gen += 1
+        self._linked.set(); self._enabled.set(); self._session.set(); self._wake()
+    def disable(self):
+        self._enabled.clear(); self._wake()
+    def close(self):
+        self._running = False; self._enabled.clear()
+        self._wake()
+        self.quit(); self.wait(1000)
+        self._wake_r.close(); self._wake_w.close()
 
 class SuperWhisperWindow(QtWidgets.QWidget):
     def __init__(self, host, port):
         super().__init__()
         self.host, self.port = host, port
         self.kb  = KeyController()
-        self.transcriber = None
         self.deepseek = True
         self.replacements = self._load_replacements()
-        self._floating_patched = False
-
-        self.waveform_proc = None
-        # locate the app‑binary once:
-        self.waveform_exec = "/Users/bread/Documents/OpenSuperWhisper/test.app/Contents/MacOS/test"
-        if not shutil.which(self.waveform_exec):
-            print(f"[warn] cannot find waveform app at {self.waveform_exec}")
+        self._ns_win = None                      # NSWindow, resolved on first show
 
         # window flags: on mac never accept focus
         flags = Qt.FramelessWindowHint | Qt.Tool | Qt.WindowStaysOnTopHint
@@ -176,11 +287,21 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         bg   = QtWidgets.QWidget(self); root.addWidget(bg)
         bg.setStyleSheet("background-color:rgba(255,255,255,230);border-radius:10px;")
         lay  = QtWidgets.QVBoxLayout(bg); lay.setContentsMargins(10,5,10,5)
-        pg.setConfigOptions(antialias=True)
         self.plot = pg.PlotWidget(bg); self.plot.setBackground(None)
         self.plot.hideAxis('bottom'); self.plot.hideAxis('left')
-        self.bars = pg.BarGraphItem(x=[],height=[],width=0.8)
-        self.plot.addItem(self.bars); lay.addWidget(self.plot)
+        self.plot.setAntialiasing(False)         # 60 axis-aligned steps gain nothing
+        # one filled step curve instead of 60 bar rects; fixed ranges, no autorange
+        self._x = np.arange(61)                  # step edges for the 60 bins
+        self.curve = pg.PlotCurveItem(x=self._x, y=np.zeros(60), stepMode="center",
+                                      fillLevel=0, brush=(0,0,0,120))
+        self.plot.addItem(self.curve); lay.addWidget(self.plot)
+        self.plot.setXRange(0, 60, padding=0); self.plot.setYRange(0, 40, padding=0)
+        self.plot.disableAutoRange()
+        # bins arrive at the audio rate; repaint at most every 33 ms with the latest
+        self._pending_bins = None
+        self._smooth = np.zeros(60, np.float32); self._tmp = np.empty(60, np.float32)
+        self._wave_timer = QtCore.QTimer(self); self._wave_timer.setInterval(33)
+        self._wave_timer.timeout.connect(self._flush_waveform)
         bar = QtWidgets.QHBoxLayout()
         self.label = QtWidgets.QLabel('Ctrl+Space record • Esc quit')
         self.label.setStyleSheet("color:gray;font:9pt 'Sans';")
@@ -190,29 +311,61 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         bar.addWidget(self.btn); bar.addStretch(1); lay.addLayout(bar)
 
         self.recorder = AudioRecorder()
-        self.recorder.data_ready.connect(self._waveform)
-        self.hk = HotkeyListener(self); self.hk.start()
+        self.recorder.bins_ready.connect(self._waveform)
+        # one transcriber (thread + TCP link) for the window's lifetime; it
+        # connects on the first recording and is only gated per session after
+        self.transcriber = RemoteTranscriber(host, port)
+        self.transcriber.text_ready.connect(self._type_text)
+        self.recorder.audio_chunk.connect(self.transcriber.send_chunk,
+                                          QtCore.Qt.DirectConnection)
+        # the user's clipboard, restored 200 ms after the last paste; restarted
+        # by each paste so back-to-back pastes don't save our own text as "theirs"
+        self._clip_saved = None
+        self._clip_timer = QtCore.QTimer(self); self._clip_timer.setSingleShot(True)
+        self._clip_timer.setInterval(200); self._clip_timer.timeout.connect(self._restore_clipboard)
+        # Ctrl+Space → start/stop, Esc → quit; pynput already runs these
+        # callbacks on its own daemon thread, so marshal them to the GUI thread
+        self._ctrl = False
+        self._listener = KeyListener(on_press=self._on_press,
+                                     on_release=self._on_release, daemon=True)
+        self._listener.start()
 
     def _make_floating(self):
-        if self._floating_patched or sys.platform != "darwin":
+        if self._ns_win is not None or sys.platform != "darwin":
             return
-        ns_view = objc.objc_object(c_void_p=int(self.winId()))
-        ns_win  = ns_view.window()
+        ns_win = objc.objc_object(c_void_p=int(self.winId())).window()
         if ns_win is None:                       # shouldn't happen
             return
         ns_win.setLevel_(NSFloatingWindowLevel)
-        ns_win.setCollectionBehavior_(
-            NSWindowCollectionBehaviorCanJoinAllSpaces
-            | NSWindowCollectionBehaviorStationary
-            | NSWindowCollectionBehaviorFullScreenAuxiliary
-            | NSWindowCollectionBehaviorIgnoresCycle
-        )
-        self._floating_patched = True
+        ns_win.setCollectionBehavior_(BEHAVIOR_MASK)
+        self._ns_win = ns_win
+
+    def _on_press(self, key):
+        if key in (Key.ctrl_l, Key.ctrl_r): self._ctrl = True
+        elif key == Key.space and self._ctrl:
+            QtCore.QMetaObject.invokeMethod(self, '_toggle_recording', Qt.QueuedConnection)
+        elif key == Key.esc:
+            QtCore.QMetaObject.invokeMethod(self, '_exit_app', Qt.QueuedConnection)
+
+    def _on_release(self, key):
+        if key in (Key.ctrl_l, Key.ctrl_r): self._ctrl = False
 
     def _load_replacements(self):
         path = os.path.join(os.path.dirname(__file__), "text_replacements.json")
-        if not os.path.exists(path): return []
-        with open(path,"r",encoding="utf-8") as f: return json.load(f)
+        reps = []
+        if os.path.exists(path):
+            with open(path,"r",encoding="utf-8") as f: reps = json.load(f)
+        # one alternation scanned once per line instead of a str.replace per rule;
+        # longest keys first so "foo bar" wins over "foo", first rule wins on dupes
+        self._map = {}
+        for r in reps:
+            if r["from"]: self._map.setdefault(r["from"], r["to"])
+        if not self._map:                        # common case: nothing to rewrite
+            self._apply = lambda t: t; return reps
+        keys = sorted(self._map, key=len, reverse=True)
+        rx, sub = re.compile('|'.join(map(re.escape, keys))), self._map.__getitem__
+        self._apply = lambda t: rx.sub(lambda m: sub(m[0]), t)
+        return reps
 
     @QtCore.pyqtSlot()
     def _toggle_recording(self):
@@ -230,36 +383,17 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         if not self.recorder.isRunning():
             self.label.setText('Recording…'); self.label.setStyleSheet("color:red;font:9pt 'Sans';")
             self.btn.setChecked(True)
-            self.transcriber = RemoteTranscriber(self.host, self.port)
-            self.recorder.audio_chunk.connect(self.transcriber.send_chunk,
-                                            QtCore.Qt.QueuedConnection)
-            self.transcriber.text_ready.connect(self._type_text)
-            self.transcriber.start(); self.recorder.start()
-        # launch Swift overlay if not already running
-        if self.waveform_proc is None:
-            try:
-                self.waveform_proc = subprocess.Popen([self.waveform_exec])
-            except Exception as e:
-                print("[waveform] failed to launch overlay:", e)
-
+            self.transcriber.enable()
+            if not self.transcriber.isRunning(): self.transcriber.start()
+            self.recorder.start(); self._wave_timer.start()
 
     def _stop_recording(self):
         if self.recorder.isRunning(): self.recorder.stop()
-        if self.transcriber:
-            self.recorder.audio_chunk.disconnect(self.transcriber.send_chunk)
-            self.transcriber.stop(); self.transcriber = None
-        self.btn.setChecked(False); self.bars.setOpts(x=[],height=[],width=0.8)
+        self.transcriber.disable()
+        self._wave_timer.stop(); self._pending_bins = None
+        self.btn.setChecked(False); self.curve.setData(x=self._x, y=np.zeros(60))
         self.label.setText('Ctrl+Space record • Esc quit')
         self.label.setStyleSheet("color:gray;font:9pt 'Sans';")
-        # ── kill Swift overlay ────────────────────────────
-        if self.waveform_proc:
-            try:
-                self.waveform_proc.terminate()
-                self.waveform_proc.wait(timeout=1)
-            except Exception:
-                self.waveform_proc.kill()
-            finally:
-                self.waveform_proc = None
 
     @QtCore.pyqtSlot()
     def _exit_app(self): 
@@ -268,21 +402,48 @@ class SuperWhisperWindow(QtWidgets.QWidget):
 
     @QtCore.pyqtSlot(str)
     def _type_text(self, text):
-        if self.deepseek:
-            for r in self.replacements: text = text.replace(r["from"], r["to"])
-        print("[Typed]", text); self.kb.type(text)
+        if self.deepseek: text = self._apply(text)
+        print("[Typed]", text)
+        if len(text) <= PASTE_MIN: self.kb.type(text); return
+        # one Cmd/Ctrl+V instead of a synthesized key event per character
+        cb = QtWidgets.QApplication.clipboard()
+        if not self._clip_timer.isActive(): self._clip_saved = self._copy_mime(cb.mimeData())
+        cb.setText(text)
+        with self.kb.pressed(PASTE_KEY): self.kb.press('v'); self.kb.release('v')
+        # give the target app time to read the clipboard before restoring it
+        self._clip_timer.start()
+
+    def _restore_clipboard(self):
+        self._clip_timer.stop()
+        QtWidgets.QApplication.clipboard().setMimeData(self._clip_saved); self._clip_saved = None
+
+    @staticmethod
+    def _copy_mime(src):
+        # every format, not just text(): images, files and rich text survive the paste
+        saved = QtCore.QMimeData()
+        for fmt in (src.formats() if src is not None else ()): saved.setData(fmt, src.data(fmt))
+        return saved
 
     @QtCore.pyqtSlot(np.ndarray)
-    def _waveform(self, w):
-        h = np.array([np.mean(p) for p in np.array_split(np.abs(w), 60)])
-        m = np.max(h) or 1; new = h/m*40
-        if not hasattr(self,'_smooth'): self._smooth = new
-        else: self._smooth = 0.6*self._smooth + 0.4*new
-        self.bars.setOpts(x=np.arange(len(self._smooth)),
-                          height=self._smooth, width=0.8)
+    def _waveform(self, h):
+        self._pending_bins = h
+
+    def _flush_waveform(self):
+        h = self._pending_bins
+        if h is None: return
+        self._pending_bins = None
+        m = h.max()
+        if m == 0: m = 1.0
+        # smooth = 0.6*smooth + 0.4*(h/m*40), in place with no temporaries
+        np.multiply(h, 0.4 * 40 / m, out=self._tmp)
+        self._smooth *= 0.6; self._smooth += self._tmp
+        self.curve.setData(x=self._x, y=self._smooth)
 
     def closeEvent(self, ev):
-        try: self._stop_recording(); self.hk.stop()
+        try:
+            self._stop_recording(); self.recorder.close()
+            self.transcriber.close(); self._listener.stop()
+            if self._clip_timer.isActive(): self._restore_clipboard()
         finally: QtWidgets.QApplication.quit(); ev.accept()
 
 if __name__ == '__main__':
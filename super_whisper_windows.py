@@ -1,185 +1,372 @@
-import sys, os, socket, asyncio, json, numpy as np
+import sys, os, re, socket, asyncio, json, numpy as np
+from collections import deque
+from itertools import islice
 import pyaudio, line_packet
-from pynput.keyboard import Controller as KeyController
+from pynput.keyboard import Controller as KeyController, Key, Listener as KeyListener
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtCore import Qt, pyqtSignal, QThread
 import pyqtgraph as pg
 
+try:
+    from numba import njit
+except ImportError:  # optional: fall back to the NumPy pipeline
+    njit = None
+
 # ── audio constants ────────────────────────────────────────────────────────────
 CHUNK    = 1024
 FORMAT   = pyaudio.paInt16
 CHANNELS = 1
 RATE     = 16000          # server expects 16 kHz
+# capture ring: ~32 s of audio, sized well past the longest GUI-thread stall
+# (2 s connect, 0.5 s socket drain, typing a long transcript); chunks the
+# writer laps anyway are detected and dropped, never sent stale
+RING_SIZE = 1 << 20
+
+# ── network constants ──────────────────────────────────────────────────────────
+SEND_BATCH    = 4         # chunks coalesced into one send syscall
+SEND_FLUSH_MS = 20        # ...or sooner, once the oldest queued chunk is this old
+HAS_SENDMSG   = hasattr(socket.socket, 'sendmsg')   # not available on Windows
+SOCK_SNDBUF   = 65536     # ~2 s of 16 kHz / 16-bit audio
+SOCK_RCVBUF   = 262144
+HAS_QUICKACK  = hasattr(socket, 'TCP_QUICKACK')     # Linux only
+CONNECT_TIMEOUT = 2.0     # s; the connect runs on the GUI thread
+BUSY_POLL_US  = 50        # --busy-poll: spin this long in the kernel before sleeping
+# Linux only; Python's socket module doesn't export the constant
+SO_BUSY_POLL  = getattr(socket, 'SO_BUSY_POLL',
+                        46 if sys.platform.startswith('linux') else None)
+
+
+# ── waveform kernel ────────────────────────────────────────────────────────────
+def smooth_waveform(mag, smooth, heights):
+    """Take the peak of the float32 magnitudes `mag` in each of len(smooth)
+    bins, log-scale them and fold them into the damped running average
+    `smooth`, in place. `heights` is scratch. Peaks rather than means keep
+    short transients visible."""
+    n = smooth.size
+    usable = (mag.size // n) * n   # the tail that doesn't fill a bin is dropped
+    mag[:usable].reshape(n, -1).max(axis=1, out=heights)
+    m = heights.max() or 1
+
+    # Apply logarithmic scaling for better visual dynamics
+    np.multiply(heights, 50.0 / m, out=heights)
+    np.log1p(heights, out=heights)
+    heights *= 15
+
+    # Smoother animation with dynamic damping:
+    # smooth = damping * smooth + (1 - damping) * new
+    damping = 0.3 if heights.max() > smooth.max() else 0.6
+    heights *= 1.0 - damping
+    smooth *= damping
+    smooth += heights
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def smooth_waveform(mag, smooth, heights):
+        # same pipeline fused into plain loops: no temporaries at all
+        n = smooth.size
+        bin_len = mag.size // n
+        m = 0.0
+        for b in range(n):
+            peak = np.float32(0.0)
+            for i in range(b * bin_len, (b + 1) * bin_len):
+                peak = max(peak, mag[i])
+            heights[b] = peak
+            m = max(m, heights[b])
+        if m == 0:
+            m = 1.0
+        peak_new = peak_old = 0.0
+        for b in range(n):
+            heights[b] = np.log1p(heights[b] * 50.0 / m) * 15.0
+            peak_new = max(peak_new, heights[b])
+            peak_old = max(peak_old, smooth[b])
+        damping = 0.3 if peak_new > peak_old else 0.6
+        for b in range(n):
+            smooth[b] = damping * smooth[b] + (1.0 - damping) * heights[b]
+
+    # compile (or load from cache) now rather than on the first recording
+    smooth_waveform(np.zeros(CHUNK, np.float32), np.zeros(80, np.float32),
+                    np.empty(80, np.float32))
 
 
 # ── worker threads ─────────────────────────────────────────────────────────────
 class AudioRecorder(QThread):
-    audio_chunk = pyqtSignal(bytes)
-    data_ready  = pyqtSignal(np.ndarray)
+    """
+    Captures into a preallocated ring and emits (pos, length) of each new
+    chunk, where pos is a monotonically increasing write position; slots read
+    it back through `view()` without copying.
+    """
+    audio_chunk = pyqtSignal('qlonglong', int)
 
     def __init__(self):
         super().__init__()
         self._running = False
         self._pa      = pyaudio.PyAudio()
+        self._ring    = bytearray(RING_SIZE)
+        self.ring     = memoryview(self._ring)
+        self._widx    = 0
+        self._pos     = 0      # bytes advanced, incl. ring tails skipped on wrap
+        self._claimed = 0      # end of the newest slot the writer has taken
 
     def run(self):
         try:
             stream = self._pa.open(format=FORMAT, channels=CHANNELS,
                                    rate=RATE, input=True,
-                                   frames_per_buffer=CHUNK)
+                                   frames_per_buffer=CHUNK,
+                                   stream_callback=self._pa_cb,
+                                   start=False)
         except Exception as e:
             print(f"Audio input error: {e}")
             return
 
+        # PortAudio's own thread delivers buffers to _pa_cb; this thread just
+        # keeps the stream alive until stop() ends the event loop. The stream
+        # is opened stopped so no callback can see _running unset and end it
         self._running = True
-        while self._running:
-            try:
-                data = stream.read(CHUNK, exception_on_overflow=False)
-            except Exception:
-                continue
-            self.audio_chunk.emit(data)
-            self.data_ready.emit(np.frombuffer(data, dtype=np.int16))
+        stream.start_stream()
+        self.exec_()
 
         stream.stop_stream()
         stream.close()
 
+    def _pa_cb(self, in_data, frame_count, time_info, status):
+        # runs on the PortAudio thread; the signal is queued to the GUI thread
+        n = len(in_data)
+        if self._widx + n > RING_SIZE:
+            self._pos += RING_SIZE - self._widx   # keeps pos % RING_SIZE == widx
+            self._widx = 0
+        pos = self._pos
+        # publish the claim before writing, so readers never trust a slot
+        # that is being overwritten
+        self._claimed = pos + n
+        self.ring[self._widx:self._widx + n] = in_data
+        self.audio_chunk.emit(pos, n)
+        self._widx += n
+        self._pos += n
+        return (None, pyaudio.paContinue if self._running else pyaudio.paComplete)
+
+    def view(self, pos, length):
+        """The chunk emitted at `pos`, or None if the writer has lapped it"""
+        if self._claimed - pos > RING_SIZE:
+            return None
+        offset = pos % RING_SIZE
+        return self.ring[offset:offset + length]
+
     def stop(self):
         self._running = False
         self.quit()          # tell Qt to end the thread loop
         self.wait(100)       # wait 100 ms max → closes instantly
 
 
-class RemoteTranscriber(QThread):
+def tune_sockopts(sock):
+    """Low-latency options for the audio/transcript connection"""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_SNDBUF)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_RCVBUF)
+    rearm_quickack(sock)
+
+
+def rearm_quickack(sock):
+    """ACK received transcript data at once rather than on the delayed-ACK
+    timer. Linux only, and not sticky: the kernel can drop back to delayed
+    ACKs, so this is re-armed after every read"""
+    if HAS_QUICKACK:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+
+def enable_busy_poll(sock):
+    """Let the kernel busy-poll the device queue on receive: lower transcript
+    latency for a little CPU. A no-op where unsupported"""
+    if SO_BUSY_POLL is None:
+        print("Busy polling is only supported on Linux")
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, BUSY_POLL_US)
+    except OSError as e:
+        print(f"Could not enable busy polling: {e}")
+
+
+class RemoteTranscriber(QtCore.QObject):
+    """
+    Streams audio to the server and emits its transcript lines. Lives on
+    the GUI thread: QSocketNotifiers report readability/writability, so
+    there is no worker thread, lock or polling loop.
+    """
     text_ready = pyqtSignal(str)
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, busy_poll=False):
         super().__init__()
         self.host, self.port = host, port
-        self._running = True
+        self.busy_poll = busy_poll
         self.sock = None
-        self.lock = QtCore.QMutex()  # Add a lock for thread-safe socket access
-
-    def run(self):
+        self._pending = deque()        # audio waiting for the next batch
+        self._draining = False         # kernel buffer filled up mid-batch
+        # receive buffer reused for every recv; a partial line stays at the front
+        self._rx = bytearray(line_packet.PACKET_SIZE)
+        self._rx_view = memoryview(self._rx)
+        self._rx_len = 0
+        # a partial batch goes out at the latest SEND_FLUSH_MS after it started
+        self._flush_timer = QtCore.QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(SEND_FLUSH_MS)
+        self._flush_timer.timeout.connect(self._flush)
+        self._rd = self._wr = None
+
+    def start(self):
         try:
-            self.lock.lock()
-            self.sock = socket.create_connection((self.host, self.port))
+            self.sock = socket.create_connection((self.host, self.port),
+                                                 timeout=CONNECT_TIMEOUT)
+            tune_sockopts(self.sock)
+            if self.busy_poll:
+                enable_busy_poll(self.sock)
             self.sock.setblocking(False)
-            self.lock.unlock()
         except Exception as e:
             print(f"Could not connect to server: {e}")
-            self.lock.unlock()
+            self.sock = None
             return
 
-        while self._running:
-            QtCore.QThread.msleep(10)
-            try:
-                self.lock.lock()
-                if self.sock is None:
-                    self.lock.unlock()
-                    continue
-                    
-                for line in line_packet.receive_lines(self.sock):
-                    parts = line.strip().split(' ', 2)
-                    if len(parts) == 3:
-                        _, _, text = parts
-                        self.text_ready.emit(text)
-                self.lock.unlock()
-            except (BlockingIOError, ConnectionError) as e:
-                self.lock.unlock()
-                continue
-            except Exception as e:
-                print(f"Unexpected error in transcriber: {e}")
-                self.lock.unlock()
-                self._cleanup_socket()
-                break
-
-    @QtCore.pyqtSlot(bytes)
-    def send_chunk(self, chunk: bytes):
-        self.lock.lock()
+        fd = self.sock.fileno()
+        self._rd = QtCore.QSocketNotifier(fd, QtCore.QSocketNotifier.Read, self)
+        self._rd.activated.connect(self._on_readable)
+        self._wr = QtCore.QSocketNotifier(fd, QtCore.QSocketNotifier.Write, self)
+        self._wr.setEnabled(False)     # only while the kernel buffer is full
+        self._wr.activated.connect(self._flush)
+
+    def _on_readable(self):
         try:
-            if self.sock is not None:
-                self.sock.send(chunk)
-        except (BlockingIOError, BrokenPipeError, OSError, ConnectionError) as e:
-            print(f"Error sending audio chunk: {e}")
+            lines = self._receive_lines()
+        except OSError as e:
+            print(f"Transcriber connection error: {e}")
+            lines = None
+        if lines is None:  # server closed the connection
             self._cleanup_socket()
-        finally:
-            self.lock.unlock()
+            return
+        for line in lines:
+            # "<beg ms> <end ms> <text>"; partition allocates no list
+            _, _, rest = line.partition(' ')
+            _, _, text = rest.partition(' ')
+            text = text.rstrip()
+            if text:
+                self.text_ready.emit(text)
+
+    def _receive_lines(self):
+        """Read into the persistent buffer and return the complete lines
+        (possibly none), or None once the server has closed the connection"""
+        try:
+            n = self.sock.recv_into(self._rx_view[self._rx_len:])
+        except BlockingIOError:
+            return []
+        if n == 0:
+            return None
+        rearm_quickack(self.sock)
+        end = self._rx_len + n
+        last = self._rx.rfind(b'\n', 0, end)
+        if last < 0 and end < len(self._rx):
+            self._rx_len = end     # no full line yet
+            return []
+        if last < 0:
+            last = end             # a line longer than the buffer: flush it
+        text = str(self._rx_view[:last], 'utf-8', 'replace')
+        tail = max(end - last - 1, 0)
+        self._rx[:tail] = self._rx[last + 1:end]
+        self._rx_len = tail
+        return text.strip('\0').split('\n')
+
+    def send_chunk(self, chunk):
+        """Queue a chunk (bytes or a view into the recorder's ring)"""
+        if self.sock is None:
+            return
+        if self._draining:
+            # may wait longer than the ring holds it; the write notifier
+            # will pick it up
+            self._pending.append(bytes(chunk))
+            return
+        self._pending.append(chunk)
+        if len(self._pending) >= SEND_BATCH:
+            self._flush()
+        elif not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush(self):
+        self._flush_timer.stop()
+        try:
+            self._draining = not self._send_pending()
+        except OSError as e:
+            print(f"Error sending audio: {e}")
+            self._cleanup_socket()
+            return
+        if self._draining:
+            # detach what's left from the ring before it wraps around
+            for i, buf in enumerate(self._pending):
+                if isinstance(buf, memoryview):
+                    self._pending[i] = bytes(buf)
+        self._wr.setEnabled(self._draining)
+
+    def _send_pending(self):
+        """Write queued audio, several chunks per syscall; True once empty"""
+        while self._pending:
+            bufs = list(islice(self._pending, SEND_BATCH))
+            try:
+                if HAS_SENDMSG:
+                    sent = self.sock.sendmsg(bufs)
+                else:
+                    sent = self.sock.send(b''.join(bufs))
+            except BlockingIOError:
+                return False
+            n = sent
+            while n:
+                head = self._pending[0]
+                if n < len(head):
+                    # keep the unsent tail at the head for the next writable
+                    self._pending[0] = memoryview(head)[n:]
+                    break
+                n -= len(head)
+                self._pending.popleft()
+            if sent < sum(map(len, bufs)):
+                return False   # kernel buffer is full
+        return True
 
     def _cleanup_socket(self):
-        """Safely close the socket"""
-        self.lock.lock()
-        try:
-            if self.sock:
-                try:
-                    self.sock.shutdown(socket.SHUT_WR)
-                    self.sock.close()
-                except Exception:
-                    pass
-                self.sock = None
-        finally:
-            self.lock.unlock()
+        """Flush queued audio, then close the socket"""
+        self._flush_timer.stop()
+        for notifier in (self._rd, self._wr):
+            if notifier is not None:
+                notifier.setEnabled(False)
+                notifier.deleteLater()
+        self._rd = self._wr = None
+        if self.sock:
+            try:
+                self.sock.settimeout(0.5)
+                while self._pending:
+                    self.sock.sendall(self._pending.popleft())
+                self.sock.shutdown(socket.SHUT_WR)
+            except Exception:
+                pass
+            self.sock.close()
+            self.sock = None
 
     def stop(self):
-        self._running = False
         self._cleanup_socket()
-        self.quit()
-        self.wait(100)
-
-# ── hot‑key listener ───────────────────────────────────────────────────────────
-class HotkeyListener(QThread):
-    """
-    * Ctrl+Space  → start recording
-    * Esc         → stop recording + exit app immediately
-    """
-    def __init__(self, window):
-        super().__init__()
-        self.window = window
-        self.ctrl   = False
-        self.listener = None
-
-    def run(self):
-        from pynput import keyboard
-        self.listener = keyboard.Listener(on_press=self.on_press,
-                                          on_release=self.on_release,
-                                          daemon=True)
-        self.listener.start()
-        self.exec_()
-
-    def on_press(self, key):
-        from pynput.keyboard import Key
-        if key in (Key.ctrl_l, Key.ctrl_r):
-            self.ctrl = True
-
-        elif key == Key.space and self.ctrl:
-            QtCore.QMetaObject.invokeMethod(self.window, '_start_recording',
-                                            Qt.QueuedConnection)
-
-        elif key == Key.esc:
-            QtCore.QMetaObject.invokeMethod(self.window, '_exit_app',
-                                            Qt.QueuedConnection)
-
-    def on_release(self, key):
-        from pynput.keyboard import Key
-        if key in (Key.ctrl_l, Key.ctrl_r):
-            self.ctrl = False
-
-    def stop(self):
-        if self.listener: self.listener.stop()
-        self.quit()
-
 
 # ── main window ────────────────────────────────────────────────────────────────
 # ... [keep all your existing imports and constants] ...
 
 class SuperWhisperWindow(QtWidgets.QWidget):
-    def __init__(self, host, port):
+    def __init__(self, host, port, busy_poll=False):
         super().__init__()
         self.kb = KeyController()
         self.transcriber = None
         self.host, self.port = host, port
+        self.busy_poll = busy_poll
         self.replacements = self._load_text_replacements()
         self.deepseek_r1_enabled = True
 
+        # Transcript text waiting to be typed
+        self._pending_text = []
+        self._type_timer = QtCore.QTimer(self)
+        self._type_timer.setSingleShot(True)
+        self._type_timer.setInterval(30)
+        self._type_timer.timeout.connect(self._flush_typing)
+
         # ── UI Setup with Improved Visuals ──────────────────────────────────
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.Tool |
                            Qt.WindowStaysOnTopHint)
@@ -209,25 +396,44 @@ class SuperWhisperWindow(QtWidgets.QWidget):
         root.addWidget(bg)
 
         # ── Enhanced Waveform Display ───────────────────────────────────────
-        pg.setConfigOptions(antialias=True)
         self.plot = pg.PlotWidget(bg)
+        self.plot.setAntialiasing(False)   # AA dominates bar repaint cost
         self.plot.setBackground(None)
         self.plot.hideAxis('bottom')
         self.plot.hideAxis('left')
         self.plot.setMinimumHeight(100)
         self.plot.setMaximumHeight(120)
         
-        # Gradient-colored bars
+        # Gradient-colored bars; x never changes, so only heights are updated
+        self._bar_x = np.arange(80)
         self.bars = pg.BarGraphItem(
-            x=[], height=[], width=0.8,
+            x=self._bar_x, height=np.zeros(80), width=0.8,
             pen=pg.mkPen(width=0),  # No border
             brush=pg.mkBrush((100, 150, 255, 200)))
+
+        # Brushes per quantized (hue, alpha), and what was last drawn
+        self._brush_cache = {}
+        self._last_key = None
+        self._drawn = np.zeros(80, np.float32)
         
         # Add a subtle background grid
         self.plot.showGrid(x=False, y=True, alpha=0.1)
         self.plot.addItem(self.bars)
         bg_layout.addWidget(self.plot)
 
+        # Waveform buffers (80 bars, more for smoother appearance)
+        self._heights   = np.empty(80, np.float32)
+        self._smooth    = np.zeros(80, np.float32)
+        self._tmp       = np.empty(80, np.float32)
+        self._mag       = np.empty(CHUNK, np.float32)   # |samples| of a chunk
+
+        # Audio chunks only park the latest frame; repaint at ~30 Hz from here
+        self._latest = None
+        self._dropped = 0      # lapped ring chunks not yet reported
+        self._paint_timer = QtCore.QTimer(self)
+        self._paint_timer.setInterval(33)
+        self._paint_timer.timeout.connect(self._paint_waveform)
+
         # ── Improved Status Area ───────────────────────────────────────────
         status = QtWidgets.QHBoxLayout()
         status.setContentsMargins(5, 0, 5, 0)
@@ -269,15 +475,51 @@ class SuperWhisperWindow(QtWidgets.QWidget):
 
         # Initialize audio components
         self.recorder = AudioRecorder()
-        self.recorder.data_ready.connect(self.update_waveform)
-        self.hk = HotkeyListener(self)
-        self.hk.start()
+        self.recorder.audio_chunk.connect(self._on_audio)
+
+        # ── hot‑keys ────────────────────────────────────────────────────────
+        # * Ctrl+Space  → start recording
+        # * Esc         → stop recording + exit app immediately
+        # pynput runs these callbacks on its own thread, so they are
+        # marshalled to the GUI thread
+        self._ctrl = False
+        self._kb_listener = KeyListener(on_press=self._on_press,
+                                        on_release=self._on_release,
+                                        daemon=True)
+        self._kb_listener.start()
+
+    # ── hot‑key callbacks (pynput thread) ──────────────────────────────────
+    def _on_press(self, key):
+        if key in (Key.ctrl_l, Key.ctrl_r):
+            self._ctrl = True
+
+        elif key == Key.space and self._ctrl:
+            QtCore.QMetaObject.invokeMethod(self, '_start_recording',
+                                            Qt.QueuedConnection)
+
+        elif key == Key.esc:
+            QtCore.QMetaObject.invokeMethod(self, '_exit_app',
+                                            Qt.QueuedConnection)
+
+    def _on_release(self, key):
+        if key in (Key.ctrl_l, Key.ctrl_r):
+            self._ctrl = False
 
     # ── helpers ────────────────────────────────────────────────────────────
     def _load_text_replacements(self):
         path = os.path.join(os.path.dirname(__file__), "text_replacements.json")
-        if not os.path.exists(path): return []
-        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+        replacements = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f: replacements = json.load(f)
+
+        # One alternation scanned once per line instead of a str.replace per
+        # rule; longest keys first, and the first rule wins on duplicates
+        self._repl_map = {}
+        for r in replacements:
+            if r["from"]: self._repl_map.setdefault(r["from"], r["to"])
+        keys = sorted(self._repl_map, key=len, reverse=True)
+        self._repl_re = re.compile("|".join(map(re.escape, keys))) if keys else None
+        return replacements
 
     # ── recording control ───────────────────────────────────────────────────
     @QtCore.pyqtSlot()
@@ -292,26 +534,24 @@ class SuperWhisperWindow(QtWidgets.QWidget):
             self.label.setStyleSheet("color:red; font:9pt 'Sans';")
             self.btn.setChecked(True)
 
-            self.transcriber = RemoteTranscriber(self.host, self.port)
-            self.recorder.audio_chunk.connect(self.transcriber.send_chunk,
-                                              QtCore.Qt.QueuedConnection)
+            self.transcriber = RemoteTranscriber(self.host, self.port,
+                                                 self.busy_poll)
             self.transcriber.text_ready.connect(self._display_and_type)
             self.transcriber.start(); self.recorder.start()
+            self._paint_timer.start()
 
     @QtCore.pyqtSlot()
     def _stop_recording(self):
         if self.recorder.isRunning():
             self.recorder.stop()
             if self.transcriber:
-                # Disconnect the signal before stopping
-                try:
-                    self.recorder.audio_chunk.disconnect(self.transcriber.send_chunk)
-                except Exception:
-                    pass
                 self.transcriber.stop()
                 self.transcriber = None
+        self._paint_timer.stop()
+        self._latest = None
+        self._last_key = None   # force a full redraw on the next session
         self.btn.setChecked(False)
-        self.bars.setOpts(x=[], height=[], width=0.8)
+        self.bars.setOpts(height=np.zeros(80))
 
     # called by the hot‑key on Esc
     @QtCore.pyqtSlot()
@@ -325,41 +565,82 @@ class SuperWhisperWindow(QtWidgets.QWidget):
     # ── text output ────────────────────────────────────────────────────────
     @QtCore.pyqtSlot(str)
     def _display_and_type(self, text):
-        if self.deepseek_r1_enabled:
-            for r in self.replacements: text = text.replace(r["from"], r["to"])
-        print(f"[Typed] {text}"); self.kb.type(text)
+        if self.deepseek_r1_enabled and self._repl_re:
+            text = self._repl_re.sub(lambda m: self._repl_map[m.group(0)], text)
+        print(f"[Typed] {text}")
+        # lines arriving in a burst are typed together, at most every 30 ms
+        self._pending_text.append(text)
+        if not self._type_timer.isActive():
+            self._type_timer.start()
+
+    def _flush_typing(self):
+        if self._pending_text:
+            text = ''.join(self._pending_text)
+            self._pending_text.clear()
+            self.kb.type(text)
+
+    # ── audio fan-out ──────────────────────────────────────────────────────
+    @QtCore.pyqtSlot('qlonglong', int)
+    def _on_audio(self, pos, length):
+        chunk = self.recorder.view(pos, length)
+        if chunk is None:
+            # the GUI thread stalled longer than the ring holds: the slot
+            # already holds newer audio, so sending it would corrupt the stream
+            self._dropped += 1
+            return
+        if self._dropped:
+            print(f"Audio ring overrun: dropped {self._dropped} chunks")
+            self._dropped = 0
+        if self.transcriber:
+            self.transcriber.send_chunk(chunk)
+        if self._paint_timer.isActive():
+            # picked up by _paint_waveform on the next tick
+            self._latest = (pos, length)
 
     # ── waveform ───────────────────────────────────────────────────────────
-    @QtCore.pyqtSlot(np.ndarray)
-    def update_waveform(self, w):
-        parts = np.array_split(np.abs(w), 80)  # More bars for smoother appearance
-        heights = np.array([np.mean(p) for p in parts])
-        m = np.max(heights) or 1
-        
-        # Apply logarithmic scaling for better visual dynamics
-        new = np.log1p(heights / m * 50) * 15
-        
-        if not hasattr(self, '_smooth'):
-            self._smooth = new
+    def _paint_waveform(self):
+        latest, self._latest = self._latest, None
+        if latest is None:
+            return
+        chunk = self.recorder.view(*latest)
+        if chunk is None:
+            return
+        w = np.frombuffer(chunk, dtype=np.int16)   # view, only when painting
+        # one int16 → float32 conversion, then everything downstream is
+        # float32 (and abs can't wrap at -32768)
+        if self._mag.size < w.size:
+            self._mag = np.empty(w.size, np.float32)
+        mag = self._mag[:w.size]
+        mag[:] = w
+        np.abs(mag, out=mag)
+        smooth_waveform(mag, self._smooth, self._heights)
+
+        # Dynamic color based on amplitude; blue shifts toward purple with
+        # intensity. Hue/alpha are quantized so each brush is built only once
+        peak = float(self._smooth.max())
+        key = (int(210 - min(50, peak * 2)) // 5 * 5,
+               int(200 - min(100, peak * 3)) // 10 * 10)
+        brush = self._brush_cache.get(key)
+        if brush is None:
+            brush = self._brush_cache[key] = pg.mkBrush((key[0], 200, 255, key[1]))
+
+        # Don't invalidate the scene for changes nobody can see
+        if key == self._last_key:
+            np.subtract(self._smooth, self._drawn, out=self._tmp)
+            if np.abs(self._tmp, out=self._tmp).max() < 0.5:
+                return
+            self.bars.setOpts(height=self._smooth)
         else:
-            # Smoother animation with dynamic damping
-            damping = 0.3 if np.max(new) > np.max(self._smooth) else 0.6
-            self._smooth = damping * self._smooth + (1-damping) * new
-        
-        # Dynamic color based on amplitude
-        peak = np.max(self._smooth)
-        hue = 210 - min(50, peak * 2)  # Blue shifts toward purple with intensity
-        self.bars.setOpts(
-            x=np.arange(len(self._smooth)),
-            height=self._smooth,
-            width=0.8,
-            brush=pg.mkBrush((hue, 200, 255, 200 - min(100, peak * 3))))
+            self.bars.setOpts(height=self._smooth, brush=brush)
+            self._last_key = key
+        self._drawn[:] = self._smooth
 
     # ── shutdown ───────────────────────────────────────────────────────────
     def closeEvent(self, event):
         try:
             self._stop_recording()
-            self.hk.stop()
+            self._flush_typing()
+            self._kb_listener.stop()
         finally:
             QtWidgets.QApplication.quit()
             event.accept()
@@ -371,8 +652,10 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--host', type=str, default='localhost')
     parser.add_argument('--port', type=int, default=43007)
+    parser.add_argument('--busy-poll', action='store_true',
+                        help='busy-poll the server socket (Linux; costs CPU)')
     args = parser.parse_args()
 
     app = QtWidgets.QApplication(sys.argv)
-    win = SuperWhisperWindow(args.host, args.port)
+    win = SuperWhisperWindow(args.host, args.port, args.busy_poll)
     sys.exit(app.exec_())